@@ -4,13 +4,13 @@ Generates realistic synthetic trip data and exposes REST API endpoints
 for the analytics dashboard.
 """
 
-from flask import Flask, jsonify, request, render_template, send_from_directory
+from flask import Flask, Response, request, render_template, send_from_directory
 import pandas as pd
 import numpy as np
-import json
+import orjson
 import os
-from datetime import datetime, timedelta
-import random
+from datetime import datetime
+from functools import lru_cache
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 
@@ -22,14 +22,37 @@ def add_cors(response):
     return response
 
 # ─── DATA GENERATION ─────────────────────────────────────────────────────────
+def price_trips(is_rush, is_late_night, is_weekend, is_airport, dist, base, rate,
+                u_rush, u_late, u_air, fare_eps, traffic, dur_eps, u_cancel):
+    """Vectorised surge / fare / duration / cancellation for every trip."""
+    # Surge multiplier
+    surge = np.ones(len(dist))
+    surge = np.where(is_rush & ~is_weekend, u_rush.round(1), surge)
+    surge = np.where(is_late_night & is_weekend, u_late.round(1), surge)
+    surge = np.where(is_airport, np.maximum(surge, u_air).round(1), surge)
+
+    # Fare
+    fare = base + rate * dist
+    fare *= surge
+    fare = np.maximum((fare + fare_eps).round(2), 5.0)
+
+    # Duration (minutes) — correlated with distance + traffic
+    traffic_factor = np.where(is_rush, traffic, 1.0)
+    duration = ((dist / 18) * 60 * traffic_factor + dur_eps).round(0)
+    duration = np.maximum(3, duration.astype(np.int64))
+
+    # Cancellation
+    cancel_prob = np.full(len(dist), 0.028)
+    cancel_prob[is_rush] = 0.075
+    cancel_prob[is_late_night] = 0.045
+    cancelled = u_cancel < cancel_prob
+    return surge, fare, duration, cancelled
+
 def generate_uber_data(n=50000):
     """Generate a realistic synthetic Uber NYC trip dataset."""
     np.random.seed(42)
-    random.seed(42)
 
     start_date = datetime(2024, 1, 1)
-    end_date   = datetime(2024, 12, 31)
-    total_secs = int((end_date - start_date).total_seconds())
 
     # Zones
     zones = [
@@ -54,117 +77,150 @@ def generate_uber_data(n=50000):
     base_fares = {'UberX':12,'Comfort':16,'UberXL':18,'Black':28,'Black SUV':38,'Green':10}
     per_mile   = {'UberX':1.8,'Comfort':2.1,'UberXL':2.3,'Black':3.2,'Black SUV':3.8,'Green':1.5}
 
-    records = []
-    for i in range(n):
-        # Random timestamp weighted to hour distribution
-        hour = np.random.choice(24, p=hour_weights)
-        rand_day = random.randint(0, 364)
-        rand_min = random.randint(0, 59)
-        rand_sec = random.randint(0, 59)
-        ts = start_date + timedelta(days=rand_day, hours=hour, minutes=rand_min, seconds=rand_sec)
-
-        weekday = ts.weekday()   # 0=Mon, 6=Sun
-        is_weekend = weekday >= 5
-        is_rush = hour in [7, 8, 9, 17, 18, 19]
-        is_late_night = hour in [22, 23, 0, 1, 2]
-
-        # Category
-        cat = np.random.choice(categories, p=cat_weights)
-
-        # Distance (miles) — exponential-ish distribution
-        dist = np.random.exponential(4.2)
-        dist = round(np.clip(dist, 0.5, 45.0), 1)
-
-        # Airport flag
-        pickup = random.choice(zones)
-        dropoff = random.choice([z for z in zones if z != pickup])
-        is_airport = 'Airport' in pickup or 'Airport' in dropoff
-
-        # Surge multiplier
-        surge = 1.0
-        if is_rush and not is_weekend:
-            surge = round(random.uniform(1.1, 1.8), 1)
-        if is_late_night and is_weekend:
-            surge = round(random.uniform(1.5, 2.8), 1)
-        if is_airport:
-            surge = round(max(surge, random.uniform(1.0, 1.6)), 1)
-
-        # Fare
-        fare = base_fares[cat] + per_mile[cat] * dist
-        fare *= surge
-        fare = round(fare + random.gauss(0, 1.5), 2)
-        fare = max(fare, 5.0)
-
-        # Duration (minutes) — correlated with distance + traffic
-        traffic_factor = 1.0
-        if is_rush: traffic_factor = random.uniform(1.3, 1.9)
-        duration = round((dist / 18) * 60 * traffic_factor + random.gauss(3, 2), 0)
-        duration = max(3, int(duration))
-
-        # Cancellation
-        cancel_prob = 0.028
-        if is_rush: cancel_prob = 0.075
-        if is_late_night: cancel_prob = 0.045
-        cancelled = random.random() < cancel_prob
-
-        # Rating (only for completed)
-        rating = None
-        if not cancelled:
-            r = np.random.normal(4.4, 0.5)
-            rating = round(np.clip(r, 1.0, 5.0), 1)
-
-        records.append({
-            'trip_id':    f'TRP{1000000+i}',
-            'timestamp':  ts.strftime('%Y-%m-%d %H:%M:%S'),
-            'date':       ts.strftime('%Y-%m-%d'),
-            'year':       ts.year,
-            'month':      ts.month,
-            'month_name': ts.strftime('%b'),
-            'day_of_week': ts.strftime('%A'),
-            'hour':       hour,
-            'pickup_zone': pickup,
-            'dropoff_zone': dropoff,
-            'category':   cat,
-            'distance_mi': dist,
-            'duration_min': duration,
-            'fare':       round(fare, 2),
-            'surge_multiplier': surge,
-            'cancelled':  cancelled,
-            'rating':     rating,
-            'is_airport': is_airport,
-            'is_weekend': is_weekend,
-        })
-
-    df = pd.DataFrame(records)
+    # Random timestamp weighted to hour distribution
+    hours    = np.random.choice(24, size=n, p=hour_weights)
+    rand_day = np.random.randint(0, 365, n)
+    rand_min = np.random.randint(0, 60, n)
+    rand_sec = np.random.randint(0, 60, n)
+    ts = pd.Series(pd.Timestamp(start_date)
+                   + pd.to_timedelta(rand_day, 'D') + pd.to_timedelta(hours, 'h')
+                   + pd.to_timedelta(rand_min, 'm') + pd.to_timedelta(rand_sec, 's'))
+
+    weekday = ts.dt.weekday.values   # 0=Mon, 6=Sun
+    is_weekend    = weekday >= 5
+    is_rush       = np.isin(hours, [7, 8, 9, 17, 18, 19])
+    is_late_night = np.isin(hours, [22, 23, 0, 1, 2])
+
+    # Category
+    cat_idx = np.random.choice(len(categories), size=n, p=cat_weights)
+
+    # Distance (miles) — exponential-ish distribution
+    dist = np.clip(np.random.exponential(4.2, n), 0.5, 45.0).round(1)
+
+    # Zones — drawn as indices; shifting the dropoff by 1..n_zones-1 (mod n_zones)
+    # guarantees it differs from the pickup without rebuilding a candidate list
+    n_zones     = len(zones)
+    pickup_idx  = np.random.randint(0, n_zones, n)
+    dropoff_idx = (pickup_idx + np.random.randint(1, n_zones, n)) % n_zones
+
+    # Airport flag — one lookup per zone, then gathered by index
+    airport_zone = np.array(['Airport' in z for z in zones])
+    is_airport = airport_zone[pickup_idx] | airport_zone[dropoff_idx]
+
+    # Per-trip noise, drawn up front in a fixed order so the sample is reproducible
+    u_rush   = np.random.uniform(1.1, 1.8, n)
+    u_late   = np.random.uniform(1.5, 2.8, n)
+    u_air    = np.random.uniform(1.0, 1.6, n)
+    fare_eps = np.random.normal(0, 1.5, n)
+    traffic  = np.random.uniform(1.3, 1.9, n)
+    dur_eps  = np.random.normal(3, 2, n)
+    u_cancel = np.random.random(n)
+
+    # Surge, fare, duration and cancellation
+    base = np.array([base_fares[c] for c in categories], dtype=float)[cat_idx]
+    rate = np.array([per_mile[c] for c in categories])[cat_idx]
+    surge, fare, duration, cancelled = price_trips(
+        is_rush, is_late_night, is_weekend, is_airport, dist, base, rate,
+        u_rush, u_late, u_air, fare_eps, traffic, dur_eps, u_cancel)
+
+    # Rating (only for completed)
+    rating = np.clip(np.random.normal(4.4, 0.5, n), 1.0, 5.0).round(1)
+    rating[cancelled] = np.nan
+
+    # Low-cardinality strings are stored as categoricals (int codes + one lookup table)
+    day_names   = ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday']
+    month_names = ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
+
+    df = pd.DataFrame({
+        'trip_id':    'TRP' + pd.Series(np.arange(1000000, 1000000 + n)).astype(str),
+        'timestamp':  ts,
+        'date':       ts.dt.normalize(),
+        'year':       ts.dt.year,
+        'month':      ts.dt.month,
+        'month_name': pd.Categorical.from_codes(ts.dt.month - 1, month_names, ordered=True),
+        'day_of_week': pd.Categorical.from_codes(weekday, day_names, ordered=True),
+        'hour':       hours,
+        'pickup_zone': pd.Categorical.from_codes(pickup_idx, zones),
+        'dropoff_zone': pd.Categorical.from_codes(dropoff_idx, zones),
+        'category':   pd.Categorical.from_codes(cat_idx, categories),
+        'distance_mi': dist,
+        'duration_min': duration,
+        'fare':       fare,
+        'surge_multiplier': surge,
+        'cancelled':  cancelled,
+        'rating':     rating,
+        'is_airport': is_airport,
+        'is_weekend': is_weekend,
+    })
+    # Smallest integer dtypes that hold each field — every scan streams less memory.
+    # Floats stay float64: float32 loses cents on revenue totals and leaks into the JSON.
+    df = df.astype({
+        'year': 'int16', 'month': 'int8', 'hour': 'int8', 'duration_min': 'int16',
+        'cancelled': bool, 'is_airport': bool, 'is_weekend': bool,
+    })
     return df
 
 # Generate once on startup
 print("Generating dataset...")
 DF = generate_uber_data(50000)
+# Newest first, so /api/trips can slice filtered rows without re-sorting
+DF = DF.sort_values('timestamp', ascending=False, kind='stable').reset_index(drop=True)
 print(f"Dataset ready: {len(DF):,} trips")
 
 # ─── HELPER ──────────────────────────────────────────────────────────────────
-def completed(df):
-    return df[df['cancelled'] == False]
-
-def safe_json(obj):
-    """Convert numpy types for JSON serialisation."""
-    if isinstance(obj, (np.integer,)): return int(obj)
-    if isinstance(obj, (np.floating,)): return float(obj)
-    if isinstance(obj, (np.bool_,)): return bool(obj)
-    if isinstance(obj, (np.ndarray,)): return obj.tolist()
-    raise TypeError(f"Not serializable: {type(obj)}")
+def c_contiguous(df):
+    """Rebuild df if any numpy column is a strided view (e.g. of an F-order block)."""
+    arrays = {c: df[c].values for c in df.columns}
+    if all(not isinstance(a, np.ndarray) or a.flags.c_contiguous for a in arrays.values()):
+        return df
+    return pd.DataFrame({c: np.ascontiguousarray(a) if isinstance(a, np.ndarray) else a
+                         for c, a in arrays.items()}, index=df.index)
+
+def _completed_frame(df):
+    comp = df[~df['cancelled'].values].reset_index(drop=True)
+    # int8 flag so surge frequency is a plain groupby mean, not a Python lambda
+    comp['_surge_up'] = (comp['surge_multiplier'].values > 1.0).astype(np.int8)
+    return c_contiguous(comp)
+
+# Every aggregation scans these two frames, so make sure their columns are C-contiguous
+DF = c_contiguous(DF)
+COMP_DF = _completed_frame(DF)
 
-# ─── ROUTES ──────────────────────────────────────────────────────────────────
-
-@app.route('/')
-def index():
-    return render_template('index.html')
+def completed(df):
+    if df is DF: return COMP_DF
+    return _completed_frame(df)
+
+def quantiles(values, qs):
+    """Linearly interpolated quantiles (pandas' default) from one np.partition pass."""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return np.full(len(qs), np.nan)
+    pos = np.asarray(qs) * (len(values) - 1)
+    lo, hi = np.floor(pos).astype(int), np.ceil(pos).astype(int)
+    part = np.partition(values, np.union1d(lo, hi))
+    return part[lo] + (part[hi] - part[lo]) * (pos - lo)
+
+def dumps(obj):
+    """Serialise to compact JSON bytes; numpy scalars and arrays are handled natively."""
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+
+def json_response(payload):
+    """Wrap an already-serialised JSON payload in a Flask response."""
+    return Response(payload, mimetype='application/json')
+
+def ojson(obj):
+    return json_response(dumps(obj))
+
+# ─── AGGREGATIONS ────────────────────────────────────────────────────────────
+# Fixed histogram bins — only the counts depend on the data
+FARE_BINS     = np.array([0,10,15,20,25,35,50,75,200])
+FARE_LABELS   = ['$0-10','$10-15','$15-20','$20-25','$25-35','$35-50','$50-75','$75+']
+RATING_BINS   = np.array([1,1.5,2,2.5,3,3.5,4,4.5,5.01])
+RATING_LABELS = ['1.0','1.5','2.0','2.5','3.0','3.5','4.0','4.5+']
 
 # ── KPI Summary ──────────────────────────────────────────────────────────────
-@app.route('/api/kpi')
-def api_kpi():
-    df = DF
+def _compute_kpi(df):
     comp = completed(df)
     total_trips    = len(df)
     total_revenue  = comp['fare'].sum()
@@ -173,10 +229,9 @@ def api_kpi():
     cancel_rate    = df['cancelled'].mean() * 100
     avg_rating     = comp['rating'].mean()
     avg_duration   = comp['duration_min'].mean()
-    surge_trips    = (comp['surge_multiplier'] > 1.0).sum()
-    surge_pct      = surge_trips / len(comp) * 100
+    surge_pct      = comp['_surge_up'].mean() * 100
 
-    return jsonify({
+    return {
         'total_trips':   int(total_trips),
         'total_revenue': round(float(total_revenue), 2),
         'avg_fare':      round(float(avg_fare), 2),
@@ -185,233 +240,328 @@ def api_kpi():
         'avg_rating':    round(float(avg_rating), 2),
         'avg_duration':  round(float(avg_duration), 1),
         'surge_pct':     round(float(surge_pct), 1),
-    })
+    }
 
 # ── Monthly trends ───────────────────────────────────────────────────────────
-@app.route('/api/monthly')
-def api_monthly():
-    comp = completed(DF)
-    grp = comp.groupby('month').agg(
+def _compute_monthly(df):
+    comp = completed(df)
+    grp = comp.groupby('month', observed=True, sort=False).agg(
         trips=('trip_id','count'),
         revenue=('fare','sum'),
         avg_fare=('fare','mean')
     ).reset_index()
     grp = grp.sort_values('month')
     months = ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
-    return jsonify({
+    return {
         'months':  [months[m-1] for m in grp['month']],
-        'trips':   [int(v) for v in grp['trips']],
-        'revenue': [round(float(v)/1000,1) for v in grp['revenue']],
-        'avg_fare':[round(float(v),2) for v in grp['avg_fare']],
-    })
+        'trips':   grp['trips'].tolist(),
+        'revenue': (grp['revenue']/1000).round(1).tolist(),
+        'avg_fare':grp['avg_fare'].round(2).tolist(),
+    }
 
 # ── Hourly pattern ───────────────────────────────────────────────────────────
-@app.route('/api/hourly')
-def api_hourly():
-    grp = DF.groupby('hour').agg(
+def _compute_hourly(df):
+    grp = df.groupby('hour', observed=True, sort=False).agg(
         trips=('trip_id','count'),
         cancel_rate=('cancelled','mean'),
         avg_fare=('fare','mean')
     ).reset_index()
     grp = grp.sort_values('hour')
     labels = [f"{h}:00" for h in grp['hour']]
-    return jsonify({
+    return {
         'hours':       labels,
-        'trips':       [int(v) for v in grp['trips']],
-        'cancel_rate': [round(float(v)*100, 2) for v in grp['cancel_rate']],
-        'avg_fare':    [round(float(v), 2) for v in grp['avg_fare']],
-    })
+        'trips':       grp['trips'].tolist(),
+        'cancel_rate': (grp['cancel_rate']*100).round(2).tolist(),
+        'avg_fare':    grp['avg_fare'].round(2).tolist(),
+    }
 
 # ── Day of week ──────────────────────────────────────────────────────────────
-@app.route('/api/dow')
-def api_dow():
+def _compute_dow(df):
     day_order = ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday']
-    grp = DF.groupby('day_of_week').agg(
+    grp = df.groupby('day_of_week', observed=True, sort=False).agg(
         trips=('trip_id','count'),
         revenue=('fare','sum'),
         avg_fare=('fare','mean')
     ).reindex(day_order).reset_index()
     short = ['Mon','Tue','Wed','Thu','Fri','Sat','Sun']
-    return jsonify({
+    return {
         'days':    short,
-        'trips':   [int(v) for v in grp['trips']],
-        'revenue': [round(float(v)/1000,1) for v in grp['revenue']],
-        'avg_fare':[round(float(v),2) for v in grp['avg_fare']],
-    })
+        'trips':   grp['trips'].tolist(),
+        'revenue': (grp['revenue']/1000).round(1).tolist(),
+        'avg_fare':grp['avg_fare'].round(2).tolist(),
+    }
 
 # ── Category split ───────────────────────────────────────────────────────────
-@app.route('/api/categories')
-def api_categories():
-    comp = completed(DF)
-    grp = comp.groupby('category').agg(
+def _compute_categories(df):
+    comp = completed(df)
+    grp = comp.groupby('category', observed=True, sort=False).agg(
         trips=('trip_id','count'),
         revenue=('fare','sum'),
         avg_fare=('fare','mean')
     ).reset_index()
     grp['pct'] = (grp['trips'] / grp['trips'].sum() * 100).round(1)
     grp = grp.sort_values('trips', ascending=False)
-    return jsonify({
+    return {
         'categories': grp['category'].tolist(),
-        'trips':      [int(v) for v in grp['trips']],
-        'revenue':    [round(float(v),2) for v in grp['revenue']],
-        'avg_fare':   [round(float(v),2) for v in grp['avg_fare']],
+        'trips':      grp['trips'].tolist(),
+        'revenue':    grp['revenue'].round(2).tolist(),
+        'avg_fare':   grp['avg_fare'].round(2).tolist(),
         'pct':        grp['pct'].tolist(),
-    })
+    }
 
 # ── Fare distribution ────────────────────────────────────────────────────────
-@app.route('/api/fare_distribution')
-def api_fare_dist():
-    comp = completed(DF)
-    bins   = [0,10,15,20,25,35,50,75,200]
-    labels = ['$0-10','$10-15','$15-20','$20-25','$25-35','$35-50','$50-75','$75+']
-    counts, _ = np.histogram(comp['fare'], bins=bins)
+def _compute_fare_distribution(df):
+    comp = completed(df)
+    counts, _ = np.histogram(comp['fare'].values, bins=FARE_BINS)
     pct = (counts / counts.sum() * 100).round(1)
-    return jsonify({'buckets': labels, 'counts': counts.tolist(), 'pct': pct.tolist()})
+    return {'buckets': FARE_LABELS, 'counts': counts.tolist(), 'pct': pct.tolist()}
 
 # ── Top zones ────────────────────────────────────────────────────────────────
-@app.route('/api/zones')
-def api_zones():
-    grp = DF.groupby('pickup_zone').agg(
-        trips=('trip_id','count'),
-        revenue=('fare','sum'),
-        avg_fare=('fare','mean')
-    ).reset_index()
-    top = grp.nlargest(10,'trips')
-    return jsonify({
-        'zones':    top['pickup_zone'].tolist(),
-        'trips':    [int(v) for v in top['trips']],
-        'revenue':  [round(float(v)/1000,1) for v in top['revenue']],
-        'avg_fare': [round(float(v),2) for v in top['avg_fare']],
-    })
+def _compute_zones(df):
+    # Rank zones by plain counts, then aggregate fares for the top 10 only.
+    # Sorting by name first keeps ties broken alphabetically, as the groupby did.
+    trips = (df['pickup_zone'].value_counts(sort=False)
+             .sort_index(key=lambda idx: idx.astype(str))
+             .nlargest(10))
+    top = (df[df['pickup_zone'].isin(trips.index)]
+           .groupby('pickup_zone', observed=True, sort=False)['fare']
+           .agg(revenue='sum', avg_fare='mean')
+           .reindex(trips.index))
+    top['trips'] = trips
+    return {
+        'zones':    top.index.tolist(),
+        'trips':    top['trips'].tolist(),
+        'revenue':  (top['revenue']/1000).round(1).tolist(),
+        'avg_fare': top['avg_fare'].round(2).tolist(),
+    }
 
 # ── Top routes ───────────────────────────────────────────────────────────────
-@app.route('/api/routes')
-def api_routes():
-    comp = completed(DF)
-    comp = comp.copy()
-    comp['route'] = comp['pickup_zone'] + ' → ' + comp['dropoff_zone']
-    grp = comp.groupby(['pickup_zone','dropoff_zone','route']).agg(
-        trips=('trip_id','count'),
+def _compute_routes(df):
+    comp = completed(df)
+    # Group on the two categorical zone columns (int codes) — no per-trip route strings
+    grp = comp.groupby(['pickup_zone','dropoff_zone'], observed=True, sort=False).agg(
+        trips=('trip_id','size'),
         avg_fare=('fare','mean'),
         avg_duration=('duration_min','mean'),
         avg_distance=('distance_mi','mean'),
-        surge_freq=('surge_multiplier', lambda x: (x > 1.0).mean())
+        surge_freq=('_surge_up','mean')
     ).reset_index()
+    # Sort by name first so ties (including for 10th place) break alphabetically
+    grp = grp.sort_values(['pickup_zone','dropoff_zone'], key=lambda s: s.astype(str))
     top = grp.nlargest(10,'trips')
-    rows = []
-    for _, r in top.iterrows():
-        rows.append({
-            'pickup':       r['pickup_zone'],
-            'dropoff':      r['dropoff_zone'],
-            'trips':        int(r['trips']),
-            'avg_fare':     round(float(r['avg_fare']),2),
-            'avg_duration': round(float(r['avg_duration']),0),
-            'avg_distance': round(float(r['avg_distance']),1),
-            'surge_freq':   round(float(r['surge_freq'])*100,1),
-        })
-    return jsonify({'routes': rows})
+    rows = pd.DataFrame({
+        'pickup':       top['pickup_zone'].astype(str),
+        'dropoff':      top['dropoff_zone'].astype(str),
+        'trips':        top['trips'],
+        'avg_fare':     top['avg_fare'].round(2),
+        'avg_duration': top['avg_duration'].round(0),
+        'avg_distance': top['avg_distance'].round(1),
+        'surge_freq':   (top['surge_freq']*100).round(1),
+    }).to_dict('records')
+    return {'routes': rows}
 
 # ── Surge analysis ───────────────────────────────────────────────────────────
-@app.route('/api/surge')
-def api_surge():
-    comp = completed(DF)
-    grp = comp.groupby('hour').agg(
+def _compute_surge(df):
+    comp = completed(df)
+    grp = comp.groupby('hour', observed=True, sort=False).agg(
         avg_surge=('surge_multiplier','mean'),
         max_surge=('surge_multiplier','max'),
-        surge_pct=('surge_multiplier', lambda x: (x>1.0).mean()*100)
+        surge_pct=('_surge_up','mean')
     ).reset_index()
-    return jsonify({
+    grp = grp.sort_values('hour')
+    return {
         'hours':     [f"{h}:00" for h in grp['hour']],
-        'avg_surge': [round(float(v),2) for v in grp['avg_surge']],
-        'max_surge': [round(float(v),2) for v in grp['max_surge']],
-        'surge_pct': [round(float(v),1) for v in grp['surge_pct']],
-    })
+        'avg_surge': grp['avg_surge'].round(2).tolist(),
+        'max_surge': grp['max_surge'].round(2).tolist(),
+        'surge_pct': (grp['surge_pct']*100).round(1).tolist(),
+    }
 
 # ── Rating distribution ──────────────────────────────────────────────────────
-@app.route('/api/ratings')
-def api_ratings():
-    comp = completed(DF)
-    bins   = [1,1.5,2,2.5,3,3.5,4,4.5,5.01]
-    labels = ['1.0','1.5','2.0','2.5','3.0','3.5','4.0','4.5+']
-    counts, _ = np.histogram(comp['rating'].dropna(), bins=bins)
-    return jsonify({'buckets': labels, 'counts': counts.tolist()})
-
-# ── Raw trips (paginated) ─────────────────────────────────────────────────────
-@app.route('/api/trips')
-def api_trips():
-    page     = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 20))
-    category = request.args.get('category','')
-    zone     = request.args.get('zone','')
-    status   = request.args.get('status','')
-
-    df = DF.copy()
-    if category: df = df[df['category'] == category]
-    if zone:     df = df[(df['pickup_zone']==zone)|(df['dropoff_zone']==zone)]
-    if status == 'completed':  df = df[df['cancelled']==False]
-    if status == 'cancelled':  df = df[df['cancelled']==True]
-
-    total  = len(df)
-    df     = df.sort_values('timestamp', ascending=False)
-    chunk  = df.iloc[(page-1)*per_page : page*per_page]
-
-    cols   = ['trip_id','timestamp','pickup_zone','dropoff_zone','category',
-              'distance_mi','duration_min','fare','surge_multiplier','cancelled','rating']
-    rows   = chunk[cols].fillna('').to_dict('records')
-    for r in rows:
-        r['cancelled'] = bool(r['cancelled'])
-        if r['rating'] == '': r['rating'] = None
-
-    return jsonify({
-        'trips':    rows,
-        'total':    int(total),
-        'page':     page,
-        'per_page': per_page,
-        'pages':    int(np.ceil(total/per_page))
-    })
+def _compute_ratings(df):
+    comp = completed(df)
+    counts, _ = np.histogram(comp['rating'].dropna().values, bins=RATING_BINS)
+    return {'buckets': RATING_LABELS, 'counts': counts.tolist()}
 
 # ── Filter options ────────────────────────────────────────────────────────────
-@app.route('/api/filters')
-def api_filters():
-    return jsonify({
-        'categories': sorted(DF['category'].unique().tolist()),
-        'zones':      sorted(DF['pickup_zone'].unique().tolist()),
-    })
+def _compute_filters(df):
+    return {
+        'categories': sorted(df['category'].unique().tolist()),
+        'zones':      sorted(df['pickup_zone'].unique().tolist()),
+    }
 
 # ── Stats summary ────────────────────────────────────────────────────────────
-@app.route('/api/stats')
-def api_stats():
-    comp = completed(DF)
-    return jsonify({
+def _compute_stats(df):
+    comp = completed(df)
+    fare_q   = quantiles(comp['fare'].values, [0.25, 0.5, 0.75, 0.95])
+    dist_med = quantiles(comp['distance_mi'].values, [0.5])[0]
+    dur_med  = quantiles(comp['duration_min'].values, [0.5])[0]
+    return {
         'fare': {
             'min':    round(float(comp['fare'].min()),2),
             'max':    round(float(comp['fare'].max()),2),
             'mean':   round(float(comp['fare'].mean()),2),
-            'median': round(float(comp['fare'].median()),2),
+            'median': round(float(fare_q[1]),2),
             'std':    round(float(comp['fare'].std()),2),
-            'p25':    round(float(comp['fare'].quantile(0.25)),2),
-            'p75':    round(float(comp['fare'].quantile(0.75)),2),
-            'p95':    round(float(comp['fare'].quantile(0.95)),2),
+            'p25':    round(float(fare_q[0]),2),
+            'p75':    round(float(fare_q[2]),2),
+            'p95':    round(float(fare_q[3]),2),
         },
         'distance': {
             'min':    round(float(comp['distance_mi'].min()),2),
             'max':    round(float(comp['distance_mi'].max()),2),
             'mean':   round(float(comp['distance_mi'].mean()),2),
-            'median': round(float(comp['distance_mi'].median()),2),
+            'median': round(float(dist_med),2),
         },
         'duration': {
             'min':    int(comp['duration_min'].min()),
             'max':    int(comp['duration_min'].max()),
             'mean':   round(float(comp['duration_min'].mean()),1),
-            'median': round(float(comp['duration_min'].median()),1),
+            'median': round(float(dur_med),1),
         },
-        'total_records': len(DF),
-    })
+        'total_records': len(df),
+    }
+
+# DF never changes after startup, so every static payload is serialised once
+AGGREGATIONS = {
+    'kpi':               _compute_kpi,
+    'monthly':           _compute_monthly,
+    'hourly':            _compute_hourly,
+    'dow':               _compute_dow,
+    'categories':        _compute_categories,
+    'fare_distribution': _compute_fare_distribution,
+    'zones':             _compute_zones,
+    'routes':            _compute_routes,
+    'surge':             _compute_surge,
+    'ratings':           _compute_ratings,
+    'filters':           _compute_filters,
+    'stats':             _compute_stats,
+}
+print("Precomputing aggregations...")
+PRECOMPUTED = {key: dumps(fn(DF)) for key, fn in AGGREGATIONS.items()}
+
+# ─── ROUTES ──────────────────────────────────────────────────────────────────
+
+@app.route('/')
+def index():
+    return render_template('index.html')
+
+# ── KPI Summary ──────────────────────────────────────────────────────────────
+@app.route('/api/kpi')
+def api_kpi():
+    return json_response(PRECOMPUTED['kpi'])
+
+# ── Monthly trends ───────────────────────────────────────────────────────────
+@app.route('/api/monthly')
+def api_monthly():
+    return json_response(PRECOMPUTED['monthly'])
+
+# ── Hourly pattern ───────────────────────────────────────────────────────────
+@app.route('/api/hourly')
+def api_hourly():
+    return json_response(PRECOMPUTED['hourly'])
+
+# ── Day of week ──────────────────────────────────────────────────────────────
+@app.route('/api/dow')
+def api_dow():
+    return json_response(PRECOMPUTED['dow'])
+
+# ── Category split ───────────────────────────────────────────────────────────
+@app.route('/api/categories')
+def api_categories():
+    return json_response(PRECOMPUTED['categories'])
+
+# ── Fare distribution ────────────────────────────────────────────────────────
+@app.route('/api/fare_distribution')
+def api_fare_dist():
+    return json_response(PRECOMPUTED['fare_distribution'])
+
+# ── Top zones ────────────────────────────────────────────────────────────────
+@app.route('/api/zones')
+def api_zones():
+    return json_response(PRECOMPUTED['zones'])
+
+# ── Top routes ───────────────────────────────────────────────────────────────
+@app.route('/api/routes')
+def api_routes():
+    return json_response(PRECOMPUTED['routes'])
+
+# ── Surge analysis ───────────────────────────────────────────────────────────
+@app.route('/api/surge')
+def api_surge():
+    return json_response(PRECOMPUTED['surge'])
+
+# ── Rating distribution ──────────────────────────────────────────────────────
+@app.route('/api/ratings')
+def api_ratings():
+    return json_response(PRECOMPUTED['ratings'])
+
+# ── Raw trips (paginated) ─────────────────────────────────────────────────────
+TRIP_COLS = ['trip_id','timestamp','pickup_zone','dropoff_zone','category',
+             'distance_mi','duration_min','fare','surge_multiplier','cancelled','rating']
+
+@lru_cache(maxsize=64)
+def _trip_positions(category, zone, status):
+    """Positions of the DF rows matching the filters, in DF's newest-first order."""
+    mask = np.ones(len(DF), dtype=bool)
+    if category: mask &= (DF['category'].values == category)
+    if zone:     mask &= ((DF['pickup_zone'].values==zone)|(DF['dropoff_zone'].values==zone))
+    if status == 'completed':  mask &= ~DF['cancelled'].values
+    if status == 'cancelled':  mask &= DF['cancelled'].values
+    return np.flatnonzero(mask)
+
+def _stream_trips(chunk, trailer):
+    """Yield the trips payload row by row instead of building the whole list first."""
+    yield b'{"trips":['
+    for i, row in enumerate(chunk.itertuples(index=False)):
+        r = row._asdict()
+        r['cancelled'] = bool(r['cancelled'])
+        if pd.isna(r['rating']): r['rating'] = None
+        yield (b',' if i else b'') + dumps(r)
+    yield trailer
+
+@app.route('/api/trips')
+def api_trips():
+    try:
+        page     = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 20))
+    except ValueError:
+        page = per_page = 0
+    category = request.args.get('category','')
+    zone     = request.args.get('zone','')
+    status   = request.args.get('status','')
+    if page < 1 or per_page < 1:
+        return json_response(dumps({'error': 'page and per_page must be integers >= 1'})), 400
+
+    pos   = _trip_positions(category, zone, status)
+    total = len(pos)
+    chunk = DF.iloc[pos[(page-1)*per_page : page*per_page]]
+
+    # Do everything that can fail before the 200 goes out; the generator only encodes rows.
+    # Timestamps stay datetime64 in DF; only the returned page is formatted
+    chunk = chunk[TRIP_COLS].assign(timestamp=chunk['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S'))
+    # Re-use the encoder for the trailer: drop the opening brace of the meta object
+    trailer = b'],' + dumps({
+        'total':    total,
+        'page':     page,
+        'per_page': per_page,
+        'pages':    -(-total // per_page),
+    })[1:]
+    return json_response(_stream_trips(chunk, trailer))
+
+# ── Filter options ────────────────────────────────────────────────────────────
+@app.route('/api/filters')
+def api_filters():
+    return json_response(PRECOMPUTED['filters'])
+
+# ── Stats summary ────────────────────────────────────────────────────────────
+@app.route('/api/stats')
+def api_stats():
+    return json_response(PRECOMPUTED['stats'])
 
 # ── Health check ──────────────────────────────────────────────────────────────
 @app.route('/api/health')
 def api_health():
-    return jsonify({'status':'ok','records': len(DF), 'timestamp': datetime.now().isoformat()})
+    return ojson({'status':'ok','records': len(DF), 'timestamp': datetime.now().isoformat()})
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=False)